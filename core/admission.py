@@ -0,0 +1,191 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Optional
+
+# ─────────────────────────────────────
+# Adaptive admission control for POST /
+#
+# Caps how many requests are in flight at once. The cap follows observed
+# latency (AIMD), but only while the cap is what's limiting us: it grows by
+# ~1 per "window" of requests while latency is normal, and is cut when
+# recent latency goes well above the long-term average. Requests
+# over the cap wait in a queue, but if their estimated wait would pass the
+# deadline they are rejected right away with a Retry-After hint, so clients
+# fail fast instead of all timing out together.
+#
+# Everything here runs on the event loop thread, so no locking is needed.
+# ─────────────────────────────────────
+
+INITIAL_LIMIT = float(os.environ.get("MEDIAFORGE_ADMISSION_INITIAL_LIMIT", "20"))
+MIN_LIMIT = float(os.environ.get("MEDIAFORGE_ADMISSION_MIN_LIMIT", "2"))
+# home is a sync endpoint so it runs in starlette's threadpool (anyio's
+# default limiter, 40 threads). A cap above that lets requests pile up in
+# the threadpool queue again, so keep the two in step if you change either.
+MAX_LIMIT = float(os.environ.get("MEDIAFORGE_ADMISSION_MAX_LIMIT", "40"))
+QUEUE_DEADLINE = float(os.environ.get("MEDIAFORGE_ADMISSION_DEADLINE", "2"))
+
+# module-level so tests can swap it without touching asyncio itself
+_wait_for = asyncio.wait_for
+
+
+class Rejected(Exception):
+    """Raised when a request is shed, retry_after is in seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        initial_limit: float = INITIAL_LIMIT,
+        min_limit: float = MIN_LIMIT,
+        max_limit: float = MAX_LIMIT,
+        deadline: float = QUEUE_DEADLINE,
+        tolerance: float = 2.0,
+        backoff: float = 0.9,
+        smoothing: float = 0.2,
+        baseline_smoothing: float = 0.01,
+        warmup: int = 20,
+        clock=time.monotonic,
+    ):
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.deadline = deadline
+        # recent latency above baseline * tolerance counts as overload
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.baseline_smoothing = baseline_smoothing
+        # no cuts until the baseline has seen this many samples
+        self.warmup = warmup
+        self.clock = clock
+
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self._waiters: deque = deque()
+        self._last_decrease: Optional[float] = None
+        self.samples = 0
+
+        self.admitted_total = 0
+        self.shed_total = 0
+
+    # ─────────────────────────────────────
+    # Acquire / release
+    # ─────────────────────────────────────
+
+    def estimated_wait(self) -> float:
+        """Rough time until a newly queued request would get a slot."""
+        if self.latency is None:
+            return 0.0
+        return (len(self._waiters) + 1) * self.latency / max(self.limit, 1)
+
+    async def acquire(self):
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self._admit()
+            return
+
+        wait = self.estimated_wait()
+        if wait > self.deadline:
+            self._shed(wait)
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        try:
+            await _wait_for(waiter, timeout=self.deadline)
+        except asyncio.TimeoutError:
+            # on 3.12+ the deadline can fire in the same loop iteration that
+            # _wake() handed us a slot, the slot is ours so take it
+            if not (waiter.done() and not waiter.cancelled()):
+                self._shed(self.estimated_wait())
+        except BaseException:
+            # cancelled right after _wake handed us a slot, give it back
+            if waiter.done() and not waiter.cancelled():
+                self.in_flight -= 1
+                self._wake()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        # the slot was counted for us in _wake
+        self.admitted_total += 1
+
+    def release(self, latency: Optional[float] = None):
+        """
+        Give the slot back. Pass latency only for requests that did real work,
+        without it the slot is freed but the limit isn't adjusted.
+        """
+        self.in_flight -= 1
+        if latency is not None:
+            self._observe(latency)
+        self._wake()
+
+    def _admit(self):
+        self.in_flight += 1
+        self.admitted_total += 1
+
+    def _shed(self, wait: float):
+        self.shed_total += 1
+        raise Rejected(max(1, math.ceil(wait)))
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    # ─────────────────────────────────────
+    # Limit adjustment
+    # ─────────────────────────────────────
+
+    def _observe(self, latency: float):
+        self.samples += 1
+        if self.latency is None:
+            self.latency = latency
+            self.baseline = latency
+        else:
+            # short EWMA follows what's happening now, the baseline is a slow
+            # long-term EWMA so a mix of fast and slow services averages out
+            # instead of the fastest request setting the bar
+            self.latency += self.smoothing * (latency - self.latency)
+            self.baseline += self.baseline_smoothing * (latency - self.baseline)
+
+        # in_flight was already decremented, +1 is the load this request saw
+        saturated = self.in_flight + 1 >= int(self.limit) or bool(self._waiters)
+        if not saturated:
+            # latency with spare slots says nothing about the limit
+            return
+
+        if self.latency > self.baseline * self.tolerance:
+            if self.samples < self.warmup:
+                return
+            # decrease at most once per latency window, otherwise a burst
+            # of slow completions would collapse the limit to the minimum
+            now = self.clock()
+            if self._last_decrease is None or now - self._last_decrease >= self.latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def metrics(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "admitted_total": self.admitted_total,
+            "shed_total": self.shed_total,
+            "latency_ms": round(self.latency * 1000, 3) if self.latency is not None else None,
+            "baseline_ms": round(self.baseline * 1000, 3) if self.baseline is not None else None,
+        }
+
+
+controller = AdmissionController()
@@ -0,0 +1,191 @@
+import cProfile
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+from urllib.parse import urlparse
+
+from core.url import extract
+from core.utils import get_service_from_url
+
+# ─────────────────────────────────────
+# Config (read once at import so the "off" path is just two comparisons)
+# MEDIAFORGE_PROFILE_TOKEN        -> admin token, sent as the X-Profile-Token header
+# MEDIAFORGE_PROFILE_SAMPLE_RATE  -> 0.0 - 1.0, fraction of requests profiled without the header
+# MEDIAFORGE_PROFILE_DIR          -> where the .prof/.json pairs are written
+# MEDIAFORGE_PROFILE_MAX          -> ring size, oldest captures are deleted past this
+# ─────────────────────────────────────
+PROFILE_TOKEN = os.environ.get("MEDIAFORGE_PROFILE_TOKEN", "")
+SAMPLE_RATE = float(os.environ.get("MEDIAFORGE_PROFILE_SAMPLE_RATE", "0") or 0)
+PROFILE_DIR = os.environ.get("MEDIAFORGE_PROFILE_DIR", "profiles")
+PROFILE_MAX = int(os.environ.get("MEDIAFORGE_PROFILE_MAX", "50") or 50)
+
+_profile_id_regex = re.compile(r"^[0-9]+-[a-z0-9_]+$")
+_ring_lock = threading.Lock()
+# cProfile is interpreter-wide on 3.12+ (sys.monitoring) and home runs in
+# the threadpool, so only one request is profiled at a time. That doesn't
+# stop other requests running meanwhile from showing up in the capture,
+# the metadata says so with "all_threads".
+_active_lock = threading.Lock()
+ALL_THREADS = sys.version_info >= (3, 12)
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """True if profiling is configured and the given token matches it."""
+    if not PROFILE_TOKEN:
+        return False
+    return hmac.compare_digest((token or "").encode(), PROFILE_TOKEN.encode())
+
+
+def should_profile(token: Optional[str]) -> bool:
+    if not PROFILE_TOKEN and SAMPLE_RATE <= 0:
+        return False
+    if is_admin(token):
+        return True
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def url_shape(url: str) -> str:
+    """
+    Describe the url without its ids, so captures can be grouped.
+
+    Puts the param names from extract()'s patternMatch back in place of their
+    values (e.g. "r/:sub/comments/:id/:title"), falls back to one "*" per path
+    segment when extract() doesn't match or raises.
+    """
+    parsed = urlparse(url)
+    path_part = parsed.path.lstrip("/")
+    query_part = f"?{parsed.query}" if parsed.query else ""
+
+    try:
+        result = extract(url)
+    except Exception:
+        result = None
+
+    if isinstance(result, dict) and "patternMatch" in result:
+        shape = path_part + query_part
+        # longest values first so an id that's part of another one stays intact
+        params = sorted(result["patternMatch"].items(), key=lambda kv: -len(kv[1] or ""))
+        for name, value in params:
+            if value:
+                shape = shape.replace(value, f":{name}", 1)
+        return shape
+
+    segments = [p for p in parsed.path.split("/") if p]
+    return "/".join("*" for _ in segments) + ("?*" if parsed.query else "")
+
+
+@contextmanager
+def _profile(url: str):
+    if not _active_lock.acquire(blocking=False):
+        # another request is being profiled, this one just runs normally
+        yield False
+        return
+    try:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            enabled = True
+        except ValueError:
+            # some other profiling tool (debugger, coverage...) is active
+            enabled = False
+        if not enabled:
+            # yield outside the except block so the ValueError doesn't end up
+            # as the __context__ of whatever the request raises
+            yield False
+            return
+
+        started = time.time()
+        try:
+            yield True
+        finally:
+            profiler.disable()
+            elapsed = time.time() - started
+            try:
+                _save(profiler, url, started, elapsed)
+            except Exception as e:
+                # never change the request's outcome because the capture failed
+                print('error: could not save profile:', e)
+    finally:
+        _active_lock.release()
+
+
+def maybe_profile(url: str, token: Optional[str] = None):
+    """
+    Context manager around the request pipeline.
+
+    Profiles with cProfile when the admin header matches or the request is
+    sampled, otherwise returns a no-op context. Yields whether it's profiling.
+    """
+    if not should_profile(token):
+        return nullcontext(False)
+    return _profile(url)
+
+
+def _save(profiler: cProfile.Profile, url: str, started: float, elapsed: float):
+    service = get_service_from_url(url)
+    profile_id = f"{time.time_ns()}-{service or 'unknown'}"
+    meta = {
+        "id": profile_id,
+        "service": service,
+        "shape": url_shape(url),
+        "started": started,
+        "duration_ms": round(elapsed * 1000, 3),
+        # True when frames from other threads' requests can be in the capture
+        "all_threads": ALL_THREADS,
+    }
+
+    with _ring_lock:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(os.path.join(PROFILE_DIR, f"{profile_id}.prof"))
+        with open(os.path.join(PROFILE_DIR, f"{profile_id}.json"), "w") as f:
+            json.dump(meta, f)
+        _trim()
+
+
+def _trim():
+    """Drop the oldest captures until the ring is back to PROFILE_MAX."""
+    ids = _ids()
+    for profile_id in ids[:max(len(ids) - PROFILE_MAX, 0)]:
+        for ext in (".prof", ".json"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, profile_id + ext))
+            except FileNotFoundError:
+                pass
+
+
+def _ids() -> list:
+    # ids start with time_ns so sorting by name is sorting by age
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    return sorted(
+        name[:-len(".prof")]
+        for name in os.listdir(PROFILE_DIR)
+        if name.endswith(".prof")
+    )
+
+
+def list_profiles() -> list:
+    """Metadata of every capture in the ring, newest first."""
+    profiles = []
+    for profile_id in reversed(_ids()):
+        try:
+            with open(os.path.join(PROFILE_DIR, f"{profile_id}.json")) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            profiles.append({"id": profile_id})
+    return profiles
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    """Path of the .prof file for an id, None if it's invalid or gone."""
+    if not _profile_id_regex.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.prof")
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,197 @@
+import asyncio
+import codecs
+import json
+import re
+from html.parser import HTMLParser
+from typing import Iterable, Optional
+from urllib.request import Request, urlopen
+
+# ─────────────────────────────────────
+# Streaming page scanner for core.match resolvers.
+#
+# Most resolvers (dailymotion, ok, rutube, newgrounds...) only want a few
+# meta tags or one JSON blob out of a big html page. Instead of downloading
+# the whole thing and parsing it, we feed chunks into an incremental
+# HTMLParser as they arrive and close the connection as soon as everything
+# asked for has been found.
+# ─────────────────────────────────────
+
+DEFAULT_CHUNK_SIZE = 16 * 1024
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+)
+
+_charset_regex = re.compile(r"charset=([\w-]+)", re.I)
+
+
+class PageScanner(HTMLParser):
+    """
+    Incremental html scanner.
+
+    meta: meta tag keys to collect, matched against the property, name or
+          itemprop attribute (e.g. "og:video", "twitter:player")
+    scripts: script tags whose body is JSON, matched by id or type
+             (e.g. "__NEXT_DATA__", "application/ld+json")
+    script_vars: js variables assigned a JSON object inside any script
+                 (e.g. "__PLAYER_CONFIG__" for `window.__PLAYER_CONFIG__ = {...};`)
+
+    Feed it text with feed(); `done` turns True once everything was found.
+    """
+
+    def __init__(
+        self,
+        meta: Iterable[str] = (),
+        scripts: Iterable[str] = (),
+        script_vars: Iterable[str] = (),
+    ):
+        super().__init__(convert_charrefs=True)
+        self.wanted_meta = set(meta)
+        self.wanted_scripts = set(scripts)
+        self.wanted_vars = set(script_vars)
+
+        self.meta: dict = {}
+        self.scripts: dict = {}
+        self.vars: dict = {}
+
+        # only buffer a script body when it could contain something we want
+        self._script_key: Optional[str] = None
+        self._script_buf: Optional[list] = None
+
+    @property
+    def done(self) -> bool:
+        return (
+            self.wanted_meta <= self.meta.keys()
+            and self.wanted_scripts <= self.scripts.keys()
+            and self.wanted_vars <= self.vars.keys()
+        )
+
+    def result(self) -> dict:
+        return {"meta": self.meta, "scripts": self.scripts, "vars": self.vars}
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta":
+            self._handle_meta(dict(attrs))
+        elif tag == "script":
+            attrs = dict(attrs)
+            for key in (attrs.get("id"), attrs.get("type")):
+                if key in self.wanted_scripts and key not in self.scripts:
+                    self._script_key = key
+                    self._script_buf = []
+                    return
+            if self.wanted_vars.difference(self.vars):
+                self._script_key = None
+                self._script_buf = []
+
+    def handle_data(self, data):
+        if self._script_buf is not None:
+            self._script_buf.append(data)
+
+    def handle_endtag(self, tag):
+        if tag != "script" or self._script_buf is None:
+            return
+        body = "".join(self._script_buf)
+        key = self._script_key
+        self._script_key = None
+        self._script_buf = None
+
+        if key is not None:
+            try:
+                self.scripts[key] = json.loads(body)
+            except ValueError:
+                pass
+            return
+        self._find_vars(body)
+
+    def _handle_meta(self, attrs: dict):
+        content = attrs.get("content")
+        if content is None:
+            return
+        for attr in ("property", "name", "itemprop"):
+            key = attrs.get(attr)
+            # keep the first one, pages often repeat og tags
+            if key in self.wanted_meta and key not in self.meta:
+                self.meta[key] = content
+
+    def _find_vars(self, body: str):
+        decoder = json.JSONDecoder()
+        for name in self.wanted_vars.difference(self.vars):
+            # skip comparisons like `name == null` and keep the first
+            # assignment that actually decodes
+            for found in re.finditer(rf"\b{re.escape(name)}\s*=(?!=)\s*", body):
+                try:
+                    value, _ = decoder.raw_decode(body, found.end())
+                except ValueError:
+                    continue
+                self.vars[name] = value
+                break
+
+
+def scan_chunks(chunks: Iterable[bytes], scanner: PageScanner, encoding: str = "utf-8") -> PageScanner:
+    """
+    Feed raw byte chunks into the scanner, stop pulling as soon as it's done.
+
+    Closing the iterator (if it's a generator) is left to the caller.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    for chunk in chunks:
+        scanner.feed(decoder.decode(chunk))
+        if scanner.done:
+            return scanner
+    scanner.feed(decoder.decode(b"", final=True))
+    scanner.close()
+    return scanner
+
+
+def fetch_page(
+    url: str,
+    meta: Iterable[str] = (),
+    scripts: Iterable[str] = (),
+    script_vars: Iterable[str] = (),
+    headers: Optional[dict] = None,
+    timeout: float = 10,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> dict:
+    """
+    Download a page and return what the scanner found.
+
+    The connection is closed once everything asked for is found or after
+    max_bytes, whichever comes first. Returns
+    {"meta": {...}, "scripts": {...}, "vars": {...}, "bytes": int, "complete": bool}
+    where complete says whether every requested item was found.
+    """
+    scanner = PageScanner(meta=meta, scripts=scripts, script_vars=script_vars)
+    request = Request(url, headers={"user-agent": DEFAULT_USER_AGENT, **(headers or {})})
+    read = 0
+
+    with urlopen(request, timeout=timeout) as response:
+        content_type = response.headers.get("content-type", "")
+        charset = _charset_regex.search(content_type)
+        encoding = charset.group(1) if charset else "utf-8"
+        try:
+            codecs.lookup(encoding)
+        except LookupError:
+            encoding = "utf-8"
+
+        def chunks():
+            nonlocal read
+            while read < max_bytes:
+                # read1 returns whatever has arrived instead of waiting
+                # for a full chunk_size, so we can stop early
+                chunk = response.read1(min(chunk_size, max_bytes - read))
+                if not chunk:
+                    return
+                read += len(chunk)
+                yield chunk
+
+        scan_chunks(chunks(), scanner, encoding)
+        # leaving the with block closes the socket, the rest is never downloaded
+
+    return {**scanner.result(), "bytes": read, "complete": scanner.done}
+
+
+async def stream_page(url: str, **kwargs) -> dict:
+    """Async wrapper around fetch_page for the async resolvers in core.match."""
+    return await asyncio.to_thread(fetch_page, url, **kwargs)
@@ -1,11 +1,46 @@
 from fastapi import FastAPI, Request, Depends,HTTPException,status
+from fastapi.responses import FileResponse, JSONResponse
+from typing import Optional
 import re
-from core.url import extract
+import time
+from core.url import extract, normalise_url
+from core import profiling
+from core.admission import controller as admission, Rejected
 from models import RequestModel
 app = FastAPI()
 
 accept_regax = re.compile(r'^(?:application|text)\/(?:json|plain)$')
 
+@app.middleware("http")
+async def admission_control(request:Request, call_next):
+    # only POST / does upstream work, everything else goes straight through
+    if request.method != "POST" or request.url.path != "/":
+        return await call_next(request)
+
+    try:
+        await admission.acquire()
+    except Rejected as e:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Service Unavailable"},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    started = time.monotonic()
+    response = None
+    try:
+        response = await call_next(request)
+        return response
+    finally:
+        # 4xx (bad headers, validation, unsupported url) return in well under
+        # a millisecond without doing upstream work, don't let them teach the
+        # controller what normal latency looks like
+        if response is not None and not 400 <= response.status_code < 500:
+            admission.release(time.monotonic() - started)
+        else:
+            admission.release()
+
+
 @app.get("/")
 def read_root():
     return {"Hello": "World"}
@@ -19,12 +54,45 @@ async def validate_headers(request:Request):
         raise HTTPException(status_code=406,detail='Unsupported type')
     
 
+async def profile_token(request:Request) -> Optional[str]:
+    # read from request.headers so the admin header stays out of the openapi schema
+    return request.headers.get("x-profile-token")
+
+
+async def require_profile_admin(token:Optional[str] = Depends(profile_token)):
+    if not profiling.is_admin(token):
+        raise HTTPException(status.HTTP_404_NOT_FOUND,'Not Found')
+
+
 @app.post('/',dependencies=[Depends(validate_headers)])
-def home(data:RequestModel):
-    # checks for host 
-    parsed = extract(data.url)
-    if "error" in parsed:
-        raise HTTPException(status.HTTP_400_BAD_REQUEST,'error parsing url')
+def home(data:RequestModel,token:Optional[str] = Depends(profile_token)):
+    with profiling.maybe_profile(data.url,token) as profiled:
+        if profiled:
+            # RequestModel already normalised the url before we got here,
+            # run it again (it's idempotent) so its cost lands in the capture
+            normalise_url(data.url)
+        # checks for host 
+        parsed = extract(data.url)
+        if "error" in parsed:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST,'error parsing url')
     
     return parsed
 
+
+@app.get('/metrics')
+def metrics():
+    return {"admission": admission.metrics()}
+
+
+@app.get('/profiles',dependencies=[Depends(require_profile_admin)])
+def list_profiles():
+    return profiling.list_profiles()
+
+
+@app.get('/profiles/{profile_id}',dependencies=[Depends(require_profile_admin)])
+def download_profile(profile_id:str):
+    path = profiling.profile_path(profile_id)
+    if not path:
+        raise HTTPException(status.HTTP_404_NOT_FOUND,'profile not found')
+    return FileResponse(path,media_type="application/octet-stream",filename=f"{profile_id}.prof")
+
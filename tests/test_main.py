@@ -0,0 +1,110 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from core import profiling
+from core.admission import AdmissionController
+
+JSON_HEADERS = {"accept": "application/json", "content-type": "application/json"}
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def profiled(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_profile_header_not_in_openapi(client):
+    schema = client.get("/openapi.json").json()
+    params = schema["paths"]["/"]["post"].get("parameters", [])
+
+    assert "x-profile-token" not in [p["name"].lower() for p in params]
+
+
+def test_profile_endpoints_need_token(client, profiled):
+    assert client.get("/profiles").status_code == 404
+    assert client.get("/profiles", headers={"x-profile-token": "wrong"}).status_code == 404
+    assert client.get("/profiles/123-reddit").status_code == 404
+
+
+def test_profiled_request_can_be_listed_and_downloaded(client, profiled):
+    token = {"x-profile-token": "secret"}
+    r = client.post(
+        "/",
+        json={"url": "https://www.reddit.com/r/abc/comments/xyz/title"},
+        headers={**JSON_HEADERS, **token},
+    )
+    assert r.status_code == 200
+
+    [meta] = client.get("/profiles", headers=token).json()
+    assert meta["service"] == "reddit"
+
+    r = client.get(f"/profiles/{meta['id']}", headers=token)
+    assert r.status_code == 200
+    assert len(r.content) > 0
+
+
+@pytest.fixture
+def admission(monkeypatch):
+    controller = AdmissionController(initial_limit=5, deadline=0.5)
+    monkeypatch.setattr(main, "admission", controller)
+    return controller
+
+
+def test_sheds_with_retry_after_when_overloaded(client, admission):
+    # every slot taken and requests taking 5s, the wait estimate is past the deadline
+    admission.in_flight = 5
+    admission.latency = 5.0
+
+    r = client.post("/", json={"url": "https://youtube.com/watch?v=abc"}, headers=JSON_HEADERS)
+
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "1"
+    assert admission.shed_total == 1
+
+
+def test_client_errors_do_not_count_as_latency(client, admission):
+    # 406 from validate_headers and 422 from RequestModel
+    client.post("/", json={"url": "https://youtube.com/watch?v=abc"}, headers={"accept": "image/png"})
+    client.post("/", json={"nope": 1}, headers=JSON_HEADERS)
+
+    assert admission.in_flight == 0
+    assert admission.admitted_total == 2
+    assert admission.samples == 0
+    assert admission.latency is None
+
+
+def test_successful_requests_count_as_latency(client, admission):
+    r = client.post("/", json={"url": "https://youtube.com/watch?v=abc"}, headers=JSON_HEADERS)
+
+    assert r.status_code == 200
+    assert admission.in_flight == 0
+    assert admission.samples == 1
+
+
+def test_other_routes_bypass_admission(client, admission):
+    client.get("/")
+
+    assert admission.admitted_total == 0
+
+
+def test_metrics(client, admission):
+    client.post("/", json={"url": "https://youtube.com/watch?v=abc"}, headers=JSON_HEADERS)
+
+    metrics = client.get("/metrics").json()["admission"]
+
+    assert set(metrics) == {
+        "limit", "in_flight", "queued", "admitted_total", "shed_total", "latency_ms", "baseline_ms",
+    }
+    assert metrics["limit"] == 5
+    assert metrics["in_flight"] == 0
+    assert metrics["admitted_total"] == 1
+    assert metrics["shed_total"] == 0
+    assert metrics["latency_ms"] is not None
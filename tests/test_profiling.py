@@ -0,0 +1,165 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from core import profiling
+
+
+@pytest.fixture
+def ring(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_MAX", 3)
+    return tmp_path
+
+
+def capture(url="https://www.reddit.com/r/abc/comments/xyz/title"):
+    with profiling.maybe_profile(url, "secret") as profiled:
+        sum(range(100))
+    return profiled
+
+
+def test_off_when_not_configured(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "")
+    monkeypatch.setattr(profiling, "SAMPLE_RATE", 0.0)
+
+    assert profiling.is_admin("") is False
+    assert profiling.is_admin(None) is False
+    assert profiling.should_profile("anything") is False
+    with profiling.maybe_profile("https://youtube.com/watch?v=1") as profiled:
+        assert profiled is False
+
+
+def test_token_gating(ring):
+    assert profiling.is_admin("secret") is True
+    assert profiling.is_admin("wrong") is False
+    assert profiling.is_admin(None) is False
+    # non-ascii header values must not blow up the comparison
+    assert profiling.is_admin("sécret") is False
+
+    assert profiling.should_profile("secret") is True
+    assert profiling.should_profile("wrong") is False
+
+
+def test_sampling(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "")
+    monkeypatch.setattr(profiling, "SAMPLE_RATE", 1.0)
+
+    assert profiling.should_profile(None) is True
+
+
+def test_capture_is_written_with_metadata(ring):
+    assert capture() is True
+
+    [meta] = profiling.list_profiles()
+    assert meta["service"] == "reddit"
+    assert meta["shape"] == "r/:sub/comments/:id/title"
+    assert meta["all_threads"] == profiling.ALL_THREADS
+    assert profiling.profile_path(meta["id"]) == os.path.join(ring, f"{meta['id']}.prof")
+
+
+def test_ring_is_trimmed_to_max(ring):
+    for _ in range(5):
+        capture()
+
+    names = os.listdir(ring)
+    assert len(profiling.list_profiles()) == 3
+    assert len([n for n in names if n.endswith(".prof")]) == 3
+    assert len([n for n in names if n.endswith(".json")]) == 3
+
+
+def test_only_one_request_profiled_at_a_time(ring):
+    url = "https://www.reddit.com/r/abc/comments/xyz/title"
+    with profiling.maybe_profile(url, "secret") as outer:
+        with profiling.maybe_profile(url, "secret") as inner:
+            pass
+
+    assert outer is True
+    assert inner is False
+    assert len(profiling.list_profiles()) == 1
+
+
+@pytest.mark.parametrize("profile_id", [
+    "../secret",
+    "..%2Fsecret",
+    "123-reddit/../../etc",
+    "123-REDDIT",
+    "",
+])
+def test_profile_path_rejects_bad_ids(ring, profile_id):
+    assert profiling.profile_path(profile_id) is None
+
+
+def test_profile_path_missing_id(ring):
+    assert profiling.profile_path("123-reddit") is None
+
+
+def test_url_shape():
+    assert profiling.url_shape("https://www.reddit.com/r/abc/comments/xyz/title") == "r/:sub/comments/:id/title"
+    assert profiling.url_shape("https://youtube.com/watch?v=abc123") == "watch?v=:id"
+
+
+def test_url_shape_falls_back_when_extract_raises():
+    # vk patterns don't compile in pattern_to_regex, extract() raises re.error
+    assert profiling.url_shape("https://vk.com/video-1_2") == "*"
+    assert profiling.url_shape("https://example.com/a/b?c=1") == "*/*?*"
+
+
+def test_vk_capture_is_written(ring):
+    capture("https://vk.com/video-1_2")
+
+    [meta] = profiling.list_profiles()
+    assert meta["service"] == "vk"
+    assert meta["shape"] == "*"
+
+
+def test_save_failure_keeps_request_outcome(ring, monkeypatch):
+    def broken_save(*args):
+        raise RuntimeError("disk on fire")
+
+    monkeypatch.setattr(profiling, "_save", broken_save)
+
+    # no exception from the capture itself
+    assert capture() is True
+
+    # and the request's own exception comes through untouched
+    with pytest.raises(KeyError) as e:
+        with profiling.maybe_profile("https://youtube.com/watch?v=1", "secret"):
+            raise KeyError("original")
+    assert e.value.args == ("original",)
+    assert not isinstance(e.value.__context__, RuntimeError)
+
+
+def test_unwritable_dir_keeps_request_outcome(ring, monkeypatch, tmp_path):
+    not_a_dir = tmp_path / "file"
+    not_a_dir.write_text("")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(not_a_dir))
+
+    assert capture() is True
+
+
+def test_enable_failure_runs_unprofiled(ring, monkeypatch):
+    class BusyProfile:
+        def enable(self):
+            raise ValueError("Another profiling tool is already active")
+
+    # swap the module's own reference, not the real cProfile
+    monkeypatch.setattr(profiling, "cProfile", SimpleNamespace(Profile=BusyProfile))
+
+    with pytest.raises(KeyError) as e:
+        with profiling.maybe_profile("https://youtube.com/watch?v=1", "secret") as profiled:
+            assert profiled is False
+            raise KeyError("original")
+    # the ValueError must not be chained onto the request's exception
+    assert e.value.__context__ is None
+    assert profiling.list_profiles() == []
+
+
+def test_metadata_is_json(ring):
+    capture()
+    [name] = [n for n in os.listdir(ring) if n.endswith(".json")]
+    with open(ring / name) as f:
+        assert set(json.load(f)) == {"id", "service", "shape", "started", "duration_ms", "all_threads"}
@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from core.stream import DEFAULT_CHUNK_SIZE, PageScanner, fetch_page, scan_chunks
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "stream")
+# body padding after the fixture's <head>, so stopping early is measurable
+PADDING = 2 * 1024 * 1024
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = os.path.join(FIXTURES, os.path.basename(self.path))
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        with open(path, "rb") as f:
+            head = f.read()
+        rest = b"<p>" + b"x" * PADDING + b"</p></body></html>"
+
+        self.send_response(200)
+        self.send_header("content-type", "text/html; charset=utf-8")
+        self.send_header("content-length", str(len(head) + len(rest)))
+        self.end_headers()
+        try:
+            # the head arrives first, the body a bit later, like over a real network
+            self.wfile.write(head)
+            self.wfile.flush()
+            time.sleep(0.05)
+            for i in range(0, len(rest), 8192):
+                self.wfile.write(rest[i:i + 8192])
+        except (BrokenPipeError, ConnectionResetError):
+            # the client hung up early, that's what we're testing
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def page_size():
+    return os.path.getsize(os.path.join(FIXTURES, "video.html")) + PADDING
+
+
+def test_extracts_meta_scripts_and_vars(server):
+    result = fetch_page(
+        f"{server}/video.html",
+        meta=["og:title", "og:video", "twitter:player"],
+        scripts=["__NEXT_DATA__"],
+        script_vars=["__PLAYER_CONFIG__"],
+    )
+
+    assert result["complete"] is True
+    assert result["meta"] == {
+        "og:title": "héllo & co",
+        "og:video": "https://cdn.example.com/video.mp4",
+        "twitter:player": "https://example.com/embed/1",
+    }
+    assert result["scripts"] == {"__NEXT_DATA__": {"props": {"id": 1, "tags": ["a", "</"]}}}
+    assert result["vars"] == {
+        "__PLAYER_CONFIG__": {"qualities": {"720": "https://cdn.example.com/720.mp4"}}
+    }
+
+
+def test_stops_downloading_once_found(server):
+    result = fetch_page(f"{server}/video.html", meta=["og:video"])
+
+    assert result["complete"] is True
+    # scanned as soon as the head arrived, not after a full chunk
+    assert result["bytes"] < DEFAULT_CHUNK_SIZE
+    assert result["bytes"] < page_size() // 100
+
+
+def test_stops_at_max_bytes_when_not_found(server):
+    result = fetch_page(f"{server}/video.html", meta=["og:missing"], max_bytes=100_000)
+
+    assert result["complete"] is False
+    assert result["meta"] == {}
+    assert result["bytes"] == 100_000
+
+
+def test_var_after_comparison_is_found():
+    scanner = PageScanner(script_vars=["__CFG__"])
+    page = b'<script>if (window.__CFG__ == null) {}; window.__CFG__ = {"a":1};</script>'
+
+    scan_chunks([page], scanner)
+
+    assert scanner.vars == {"__CFG__": {"a": 1}}
+
+
+def test_multibyte_split_across_chunks():
+    scanner = PageScanner(meta=["og:title"])
+    page = '<meta property="og:title" content="日本語">'.encode()
+
+    # split every byte, so multibyte characters land in separate chunks
+    scan_chunks([page[i:i + 1] for i in range(len(page))], scanner)
+
+    assert scanner.meta == {"og:title": "日本語"}